@@ -1,13 +1,25 @@
 import os
 import sys
+import json
+import mmap
 import shutil
 
 from Qt import QtCore, QtWidgets, QtGui
-from collections import deque
+from collections import deque, defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from enum import Enum
+from operator import attrgetter
 from dcc.ui import quicwindow
 from dcc.perforce import clientutils, cmds, isConnected
 
+try:
+
+    import blake3
+
+except ImportError:
+
+    blake3 = None
+
 import logging
 logging.basicConfig()
 log = logging.getLogger(__name__)
@@ -25,6 +37,28 @@ class QFileStatus(Enum):
     Edit = 3
 
 
+class QDirectoryItem(QtGui.QStandardItem):
+    """
+    Overload of QStandardItem used to display directory items.
+    """
+
+    # region Dunderscores
+    __icon__ = QtGui.QIcon(':/p4v/icons/p4v_folder.png')
+
+    def __init__(self, name):
+        """
+        Overloaded method called after a new instance has been created.
+        All directory items share the same icon rather than loading a new one per item.
+
+        :type name: str
+        """
+
+        # Call parent method
+        #
+        super(QDirectoryItem, self).__init__(self.__icon__, name)
+    # endregion
+
+
 class QDepotItem(QtGui.QStandardItem):
     """
     Overload of QStandardItem used to display depot items.
@@ -38,12 +72,17 @@ class QDepotItem(QtGui.QStandardItem):
         QFileStatus.Edit: QtGui.QIcon(':/p4v/icons/p4v_file_edit.png')
     }
 
-    def __init__(self, sourcePath, targetPath):
+    def __init__(self, relativePath, packageDirectories, status=None, name=None):
         """
         Overloaded method called after a new instance has been created.
+        The package directories are expected to be a tuple shared between all items from the same diff.
+        An optional file status can be supplied to skip evaluating the files.
+        An optional name can also be supplied to skip splitting the relative path.
 
-        :type sourcePath: str
-        :type targetPath: str
+        :type relativePath: str
+        :type packageDirectories: tuple[str, str]
+        :type status: QFileStatus
+        :type name: str
         """
 
         # Call parent method
@@ -51,11 +90,14 @@ class QDepotItem(QtGui.QStandardItem):
         super(QDepotItem, self).__init__()
 
         # Declare class variables
+        # Only the relative path is stored since the source and target paths can be derived from it
         #
-        self._sourcePath, self._targetPath = sourcePath, targetPath
+        self._relativePath = sys.intern(relativePath)
+        self._packageDirectories = packageDirectories
+        self._name = relativePath.rpartition(os.sep)[2] if name is None else name
 
-        self._filename = os.path.split(sourcePath)[1]
-        self._status = self.evaluateFileStatus(sourcePath, targetPath)
+        self._status = self.evaluateFileStatus(self.sourcePath(), self.targetPath()) if status is None else status
+        self._icon = self.__icons__[self._status]
     # endregion
 
     # region Methods
@@ -71,16 +113,25 @@ class QDepotItem(QtGui.QStandardItem):
         #
         if role == QtCore.Qt.DisplayRole:
 
-            return self._filename
+            return self._name
 
         elif role == QtCore.Qt.DecorationRole:
 
-            return self.__class__.__icons__[self._status]
+            return self._icon
 
         else:
 
             return super(QDepotItem, self).data(role=role)
 
+    def relativePath(self):
+        """
+        Method used to retrieve the relative path for this item.
+
+        :rtype: str
+        """
+
+        return self._relativePath
+
     def sourcePath(self):
         """
         Method used to retrieve the source path for this item.
@@ -88,7 +139,7 @@ class QDepotItem(QtGui.QStandardItem):
         :rtype: str
         """
 
-        return self._sourcePath
+        return os.path.join(self._packageDirectories[0], self._relativePath)
 
     def targetPath(self):
         """
@@ -97,7 +148,7 @@ class QDepotItem(QtGui.QStandardItem):
         :rtype: str
         """
 
-        return self._targetPath
+        return os.path.join(self._packageDirectories[1], self._relativePath)
 
     def status(self):
         """
@@ -109,40 +160,336 @@ class QDepotItem(QtGui.QStandardItem):
         return self._status
 
     @staticmethod
-    def evaluateFileStatus(sourcePath, targetPath):
+    def evaluateFileStatus(sourcePath, targetPath, sourceStat=None, targetStat=None, shallow=False):
         """
         Static method used to evaluate the file status for a given pair of files.
+        Files with different sizes are assumed to be edited without comparing their contents, except for python sources.
+        If shallow is enabled then files with matching sizes and modified times are assumed to be unchanged.
+        Any pre-existing stat results can be supplied to avoid querying the file system again.
 
         :type sourcePath: str
         :type targetPath: str
+        :type sourceStat: os.stat_result
+        :type targetStat: os.stat_result
+        :type shallow: bool
         :rtype: QFileStatus
         """
 
         # Check if source file exists
+        # A single stat call per file doubles as an existence check!
+        # Any parent directory that has been replaced by a file also means the file is missing
+        #
+        if sourceStat is None:
+
+            try:
+
+                sourceStat = os.stat(sourcePath)
+
+            except (FileNotFoundError, NotADirectoryError):
+
+                return QFileStatus.Add
+
+        # Check if target file exists
+        #
+        if targetStat is None:
+
+            try:
+
+                targetStat = os.stat(targetPath)
+
+            except (FileNotFoundError, NotADirectoryError):
+
+                return QFileStatus.Delete
+
+        # Check if file sizes match
+        # Python sources are exempt since their line endings are allowed to differ
+        #
+        if sourceStat.st_size != targetStat.st_size and not sourcePath.endswith('.py'):
+
+            return QFileStatus.Edit
+
+        # Check if file signatures match
+        # This mirrors the shallow comparison used by `filecmp`
         #
-        if os.path.exists(sourcePath):
+        if shallow and sourceStat.st_size == targetStat.st_size and sourceStat.st_mtime == targetStat.st_mtime:
+
+            return QFileStatus.Unchanged
+
+        # Check if files are identical
+        #
+        isIdentical = QP4ckageMerger.isIdenticalCached(sourcePath, targetPath, sourceStat, targetStat)
+
+        if isIdentical:
+
+            return QFileStatus.Unchanged
+
+        else:
+
+            return QFileStatus.Edit
+    # endregion
+
+
+class QDiffThread(QtCore.QThread):
+    """
+    Overload of QThread used to collect and evaluate package files in the background.
+    No items are created here since Qt items should only be created from the main thread.
+    """
+
+    # region Signals
+    progressChanged = QtCore.Signal(int, int)
+    diffReady = QtCore.Signal(object, object, object, object)
+    diffFailed = QtCore.Signal(str)
+    # endregion
+
+    # region Dunderscores
+    __ignored_suffixes__ = ('.pyc', '.pyo')
+    __ignored_directories__ = {'__pycache__', '.git', '.svn'}
 
-            # Check if target file exists
+    def __init__(self, sourceDirectory, targetDirectory, shallow=False, parent=None):
+        """
+        Private method called after a new instance has been created.
+
+        :type sourceDirectory: str
+        :type targetDirectory: str
+        :type shallow: bool
+        :type parent: QtCore.QObject
+        :rtype: None
+        """
+
+        # Call parent method
+        #
+        super(QDiffThread, self).__init__(parent)
+
+        # Declare private variables
+        #
+        self._sourceDirectory = sourceDirectory
+        self._targetDirectory = targetDirectory
+        self._shallow = shallow
+    # endregion
+
+    # region Methods
+    @classmethod
+    def scanDirectory(cls, directory):
+        """
+        Returns the file and directory entries belonging to the supplied directory sorted by name.
+        Ignored entries are rejected by name before their file type is ever inspected.
+        Directory entries cache their file type which saves querying the file system.
+
+        :type directory: str
+        :rtype: list[os.DirEntry]
+        """
+
+        # Iterate through entries
+        #
+        entries = []
+
+        with os.scandir(directory) as it:
+
+            for entry in it:
+
+                if entry.name in cls.__ignored_directories__ or entry.name.endswith(cls.__ignored_suffixes__):
+
+                    log.info('Skipping: %s' % entry.path)
+                    continue
+
+                elif entry.is_file(follow_symlinks=False) or entry.is_dir(follow_symlinks=False):
+
+                    entries.append(entry)
+
+                else:
+
+                    log.info('Skipping: %s' % entry.path)
+                    continue
+
+        return sorted(entries, key=attrgetter('name'))
+
+    def collectPackageItems(self):
+        """
+        Method used to collect the relative directories and file pairs from both packages.
+        Both packages are walked in a single pass by merging their sorted entries so each relative path is only visited once.
+        Entries that are a file in one package and a directory in the other cannot be merged so they are returned as conflicts instead.
+        Stat results are only omitted for files that are missing from a package.
+        If an interruption is requested then none is returned instead!
+
+        :rtype: tuple[list[str], dict[str, list], list[str]]
+        """
+
+        # Consume relative directories in queue
+        # Each directory keeps track of which packages it exists in so missing directories are never scanned
+        #
+        directories = []
+        files = {}
+        conflicts = []
+
+        queue = deque([('', True, True)])
+
+        while len(queue):
+
+            # Check if an interruption was requested
             #
-            if os.path.exists(targetPath):
+            if self.isInterruptionRequested():
+
+                return None, None, None
+
+            relativeDirectory, sourceExists, targetExists = queue.popleft()
+
+            sourceEntries = self.scanDirectory(os.path.join(self._sourceDirectory, relativeDirectory)) if sourceExists else []
+            targetEntries = self.scanDirectory(os.path.join(self._targetDirectory, relativeDirectory)) if targetExists else []
+
+            numSourceEntries, numTargetEntries = len(sourceEntries), len(targetEntries)
+            i, j = 0, 0
+
+            while i < numSourceEntries or j < numTargetEntries:
 
-                # Check if files are identical
+                # Advance whichever entry comes first
+                # If both entries share the same name then advance both
                 #
-                if QP4ckageMerger.isIdentical(sourcePath, targetPath):
+                sourceEntry = sourceEntries[i] if i < numSourceEntries else None
+                targetEntry = targetEntries[j] if j < numTargetEntries else None
 
-                    return QFileStatus.Unchanged
+                if targetEntry is None or (sourceEntry is not None and sourceEntry.name < targetEntry.name):
+
+                    pairs = [(sourceEntry, None)]
+                    i += 1
+
+                elif sourceEntry is None or targetEntry.name < sourceEntry.name:
+
+                    pairs = [(None, targetEntry)]
+                    j += 1
+
+                elif sourceEntry.is_dir(follow_symlinks=False) != targetEntry.is_dir(follow_symlinks=False):
+
+                    conflicts.append(os.path.join(relativeDirectory, sourceEntry.name))
+                    pairs = []
+                    i += 1
+                    j += 1
 
                 else:
 
-                    return QFileStatus.Edit
+                    pairs = [(sourceEntry, targetEntry)]
+                    i += 1
+                    j += 1
 
-            else:
+                # Inspect entry pairs
+                #
+                for (sourceEntry, targetEntry) in pairs:
 
-                return QFileStatus.Delete
+                    entry = sourceEntry if sourceEntry is not None else targetEntry
+                    relativePath = os.path.join(relativeDirectory, entry.name)
 
-        else:
+                    if entry.is_dir(follow_symlinks=False):
 
-            return QFileStatus.Add
+                        directories.append(relativePath)
+                        queue.append((relativePath, sourceEntry is not None, targetEntry is not None))
+
+                    else:
+
+                        files[relativePath] = [
+                            os.path.join(self._sourceDirectory, relativePath),
+                            os.path.join(self._targetDirectory, relativePath),
+                            sourceEntry.stat(follow_symlinks=False) if sourceEntry is not None else None,
+                            targetEntry.stat(follow_symlinks=False) if targetEntry is not None else None
+                        ]
+
+        return directories, files, conflicts
+
+    def evaluateFileStatuses(self, files):
+        """
+        Method used to evaluate the file statuses for the supplied file pairs.
+        Since this work is bound by file IO the pairs are evaluated in parallel.
+        If an interruption is requested then none is returned instead!
+
+        :type files: dict[str, list]
+        :rtype: dict[str, QFileStatus]
+        """
+
+        # Submit file pairs to thread pool
+        #
+        statuses = {}
+        maxWorkers = min(32, (os.cpu_count() or 1) * 4)
+
+        with ThreadPoolExecutor(max_workers=maxWorkers) as executor:
+
+            futures = {}
+
+            for (relativePath, (sourcePath, targetPath, sourceStat, targetStat)) in files.items():
+
+                # Check if file is missing from either package
+                # The walk already knows this so there is no need to query the file system again
+                #
+                if sourceStat is None:
+
+                    statuses[relativePath] = QFileStatus.Add
+                    continue
+
+                elif targetStat is None:
+
+                    statuses[relativePath] = QFileStatus.Delete
+                    continue
+
+                # Compare file pair
+                #
+                future = executor.submit(
+                    QDepotItem.evaluateFileStatus,
+                    sourcePath,
+                    targetPath,
+                    sourceStat=sourceStat,
+                    targetStat=targetStat,
+                    shallow=self._shallow
+                )
+
+                futures[future] = relativePath
+
+            # Collect results as they complete
+            #
+            numFutures = len(futures)
+
+            for (i, future) in enumerate(as_completed(futures), start=1):
+
+                statuses[futures[future]] = future.result()
+                self.progressChanged.emit(i, numFutures)
+
+                # Check if an interruption was requested
+                #
+                if self.isInterruptionRequested():
+
+                    for pending in futures:
+
+                        pending.cancel()
+
+                    return None
+
+        return statuses
+
+    def run(self):
+        """
+        Overloaded method called after the thread has been started.
+        Any errors are reported through the diff failed signal since they cannot propagate past this thread.
+
+        :rtype: None
+        """
+
+        # Collect and evaluate file pairs
+        #
+        try:
+
+            directories, files, conflicts = self.collectPackageItems()
+
+            if files is None:
+
+                return
+
+            statuses = self.evaluateFileStatuses(files)
+
+        except Exception as exception:
+
+            log.exception('Unable to diff packages!')
+            self.diffFailed.emit(str(exception))
+            return
+
+        if statuses is not None:
+
+            self.diffReady.emit(directories, files, statuses, conflicts)
     # endregion
 
 
@@ -152,7 +499,11 @@ class QP4ckageMerger(quicwindow.QUicWindow):
     """
 
     # region Dunderscores
-    __escape_chars__ = ''.join([chr(char) for char in range(1, 32)])
+    __chunk_size__ = 65536
+    __mmap_chunk_size__ = 1048576
+    __mmap_threshold__ = 1048576
+    __hash_cache__ = {}
+    __identical_cache__ = {}
 
     def __init__(self, *args, **kwargs):
         """
@@ -175,6 +526,13 @@ class QP4ckageMerger(quicwindow.QUicWindow):
         self._currentClient = None
         self._changelists = None
         self._currentChangelist = None
+        self._fastCompare = False
+        self._diffThread = None
+        self._progressDialog = None
+        self._pathIndex = {}
+        self._depotItems = []
+        self._packageDirectories = ('', '')
+        self._hashCachePath = self.defaultHashCachePath()
 
         # Declare public variables
         #
@@ -206,6 +564,8 @@ class QP4ckageMerger(quicwindow.QUicWindow):
         self.changelistWidget = None
         self.changelistLabel = None
         self.changelistComboBox = None
+        self.fastCompareCheckBox = None
+        self.forceRescanCheckBox = None
 
         self.commitPushButton = None
     # endregion
@@ -245,13 +605,12 @@ class QP4ckageMerger(quicwindow.QUicWindow):
         super(QP4ckageMerger, self).postLoad(*args, **kwargs)
 
         # Initialize package item model
+        # The model is only assigned to the view once it has been populated
         #
         self.packageItemModel = QtGui.QStandardItemModel(parent=self)
         self.packageItemModel.setObjectName('packageItemModel')
         self.packageItemModel.setHorizontalHeaderLabels(['Name'])
 
-        self.packageTreeView.setModel(self.packageItemModel)
-
     def loadSettings(self, settings):
         """
         Loads the user settings.
@@ -272,6 +631,17 @@ class QP4ckageMerger(quicwindow.QUicWindow):
         port = settings.value('editor/port', defaultValue=os.environ.get('P4PORT', ''), type=str)
         self.portLineEdit.setText(port)
 
+        fastCompare = settings.value('editor/fastCompare', defaultValue=False, type=bool)
+        self.fastCompareCheckBox.setChecked(fastCompare)
+
+        # Load file hashes from previous sessions
+        # The hashes are stored in their own file since they are far too large for the settings
+        #
+        self._hashCachePath = settings.value('editor/hashCachePath', defaultValue=self.defaultHashCachePath(), type=str)
+        self.loadHashCache(self._hashCachePath)
+
+        settings.remove('editor/hashCache')
+
     def saveSettings(self, settings):
         """
         Saves the user settings.
@@ -288,45 +658,147 @@ class QP4ckageMerger(quicwindow.QUicWindow):
         #
         settings.setValue('editor/user', self.userLineEdit.text())
         settings.setValue('editor/port', self.portLineEdit.text())
+        settings.setValue('editor/fastCompare', self.fastCompareCheckBox.isChecked())
+
+        # Save file hashes from the last diff
+        # Only files that are still part of the packages are kept so the cache cannot grow indefinitely
+        # If no diff was performed then the previously saved hashes are left as is
+        #
+        settings.setValue('editor/hashCachePath', self._hashCachePath)
+
+        if len(self._depotItems) > 0:
+
+            filePaths = {filePath for item in self._depotItems for filePath in (item.sourcePath(), item.targetPath())}
+            self.saveHashCache(self._hashCachePath, filePaths=filePaths)
 
     @staticmethod
-    def iterChildItems(item, column=0):
+    def defaultHashCachePath():
         """
-        Generator method used to iterate through the immediate children belonging to the supplied item.
-        An additional column keyword can be supplied to offset the lookup.
+        Returns the default path for the file hash cache.
 
-        :type item: QtGui.QStandardItem
-        :type column: int
-        :rtype: iter
+        :rtype: str
         """
 
-        # Iterate through rows
+        cacheDirectory = QtCore.QStandardPaths.writableLocation(QtCore.QStandardPaths.CacheLocation)
+        return os.path.join(cacheDirectory, 'p4ckagemerger', 'hashCache.json')
+
+    @classmethod
+    def loadHashCache(cls, filePath):
+        """
+        Loads the file hashes from the supplied cache file.
+        Any missing or malformed cache files are ignored.
+
+        :type filePath: str
+        :rtype: None
+        """
+
+        # Check if cache file exists
         #
-        for i in range(item.rowCount()):
+        if not os.path.isfile(filePath):
 
-            yield item.child(i, column)
+            return
+
+        # Try and load cache file
+        #
+        try:
+
+            with open(filePath, 'r') as jsonFile:
+
+                hashCache = json.load(jsonFile)
+
+        except (OSError, ValueError) as exception:
 
-    def walk(self):
+            log.debug(exception)
+            return
+
+        # Inspect cache contents
+        #
+        if not isinstance(hashCache, dict):
+
+            log.debug('Unable to load hash cache: %s' % filePath)
+            return
+
+        for (path, value) in hashCache.items():
+
+            if isinstance(value, list) and len(value) == 3:
+
+                cls.__hash_cache__[path] = tuple(value)
+
+    @classmethod
+    def saveHashCache(cls, filePath, filePaths=None):
         """
-        Generator method used to iterate through ALL of the tree view items.
+        Saves the file hashes to the supplied cache file.
+        An optional set of file paths can be supplied to prune the cache down to.
+        The cache is written to a temporary file first so an interrupted save cannot corrupt it.
 
-        :rtype: iter
+        :type filePath: str
+        :type filePaths: set[str]
+        :rtype: None
         """
 
-        # Consume items in queue
+        # Prune cached hashes
         #
-        queue = deque([self.topLevelItem()])
+        if filePaths is not None:
 
-        while len(queue):
+            hashCache = {path: value for (path, value) in cls.__hash_cache__.items() if path in filePaths}
 
-            # Pop and yield item
-            #
-            item = queue.popleft()
-            yield item
+        else:
 
-            # Add item's children to queue
-            #
-            queue.extend(self.iterChildItems(item))
+            hashCache = cls.__hash_cache__
+
+        # Try and save cache file
+        #
+        tempPath = '%s.tmp' % filePath
+
+        try:
+
+            os.makedirs(os.path.dirname(filePath), exist_ok=True)
+
+            with open(tempPath, 'w') as jsonFile:
+
+                json.dump(hashCache, jsonFile)
+
+            os.replace(tempPath, filePath)
+
+        except OSError as exception:
+
+            log.warning('Unable to save hash cache: %s' % exception)
+
+    def attachModel(self):
+        """
+        Assigns the package item model to the tree view.
+
+        :rtype: None
+        """
+
+        self.packageTreeView.setModel(self.packageItemModel)
+
+    def detachModel(self):
+        """
+        Removes the package item model from the tree view.
+        This prevents the view from responding to any model changes until the model is attached again.
+
+        :rtype: None
+        """
+
+        self.packageTreeView.setModel(None)
+
+    @staticmethod
+    def iterChildItems(item, column=0):
+        """
+        Generator method used to iterate through the immediate children belonging to the supplied item.
+        An additional column keyword can be supplied to offset the lookup.
+
+        :type item: QtGui.QStandardItem
+        :type column: int
+        :rtype: iter
+        """
+
+        # Iterate through rows
+        #
+        for i in range(item.rowCount()):
+
+            yield item.child(i, column)
 
     def topLevelItems(self, column=0):
         """
@@ -350,89 +822,79 @@ class QP4ckageMerger(quicwindow.QUicWindow):
 
         return self.topLevelItems(column=column)[0]
 
-    def addFileItem(self, filePath, parent=None):
+    def addFileItem(self, relativePath, status=None, pendingRows=None):
         """
         Method used to add a new file item to the tree view.
         This method will inspect to determine if the item already exists.
+        The parent directory item is expected to already exist!
+        If a pending rows dictionary is supplied then the item is queued under its parent's path instead.
 
-        :type filePath: str
-        :type parent: QtGui.QStandardItem
+        :type relativePath: str
+        :type status: QFileStatus
+        :type pendingRows: dict[str, list[QtGui.QStandardItem]]
         :rtype: None
         """
 
         # Check if file item already exists
         #
-        relativePath = self.makePathRelative(filePath)
-        item = self.findChildByPath(relativePath)
-
-        if item is not None:
+        if relativePath in self._pathIndex:
 
             return
 
-        # Get item arguments
+        # Split relative path
+        # Top level items are parented to the top level directory
         #
-        sourcePath = None
-        targetPath = None
+        parentPath, _, name = relativePath.rpartition(os.sep)
+        parentPath = parentPath or '.'
 
-        if self.isSourceFile(filePath):
+        item = QDepotItem(relativePath, self._packageDirectories, status=status, name=name)
 
-            sourcePath = filePath
-            targetPath = os.path.join(self._targetDirectory, relativePath)
+        if pendingRows is not None:
+
+            pendingRows[parentPath].append(item)
 
         else:
 
-            sourcePath = os.path.join(self._sourceDirectory, relativePath)
-            targetPath = filePath
+            self._pathIndex[parentPath].appendRow(item)
 
-        # Create new item
-        #
-        item = QDepotItem(sourcePath, targetPath)
-        parent.appendRow(item)
+        self._pathIndex[relativePath] = item
+        self._depotItems.append(item)
 
-    def addDirectoryItem(self, directory, parent=None):
+    def addDirectoryItem(self, relativePath, pendingRows=None):
         """
         Method used to add a new directory item to the tree view.
         This method will inspect to determine if the item already exists.
+        The parent directory item is expected to already exist!
+        If a pending rows dictionary is supplied then the item is queued under its parent's path instead.
 
-        :type directory: str
-        :type parent: QtGui.QStandardItem
+        :type relativePath: str
+        :type pendingRows: dict[str, list[QtGui.QStandardItem]]
         :rtype: None
         """
 
         # Check if directory item already exists
         #
-        relativePath = self.makePathRelative(directory)
-        item = self.findChildByPath(relativePath)
-
-        if item is None:
-
-            # Create new item
-            #
-            name = os.path.split(directory)[1]
-            item = QtGui.QStandardItem(QtGui.QIcon(':/p4v/icons/p4v_folder.png'), name)
+        if relativePath in self._pathIndex:
 
-            parent.appendRow(item)
+            return
 
-        # Iterate through children
+        # Split relative path
+        # Top level items are parented to the top level directory
         #
-        for filename in os.listdir(directory):
-
-            # Concatenate file path
-            #
-            filePath = os.path.join(directory, filename)
+        parentPath, _, name = relativePath.rpartition(os.sep)
+        parentPath = parentPath or '.'
 
-            if os.path.isfile(filePath) and not filePath.endswith('.pyc'):
+        item = QDirectoryItem(name)
 
-                self.addFileItem(filePath, parent=item)
+        if pendingRows is not None:
 
-            elif os.path.isdir(filePath):
+            pendingRows[parentPath].append(item)
 
-                self.addDirectoryItem(filePath, parent=item)
+        else:
 
-            else:
+            self._pathIndex[parentPath].appendRow(item)
 
-                log.info('Skipping: %s' % filePath)
-                continue
+        self._pathIndex[relativePath] = item
 
     @classmethod
     def findChildByName(cls, parent, name, column=0):
@@ -462,102 +924,212 @@ class QP4ckageMerger(quicwindow.QUicWindow):
     def findChildByPath(self, path):
         """
         Method used to retrieve an item using a string path with a compatible delimiter.
+        Items are looked up from the path index populated during the last diff.
 
         :type path: str
         :rtype: QtGui.QStandardItem
         """
 
-        # Check for redundancy
-        #
-        item = self.topLevelItem()
-
-        if path == '.':
-
-            return item
-
-        # Iterate through sub paths
-        #
-        queue = deque(path.split(os.sep))
-
-        while len(queue):
-
-            name = queue.popleft()
-            item = self.findChildByName(item, name)
-
-        return item
+        return self._pathIndex.get(os.path.normpath(path), None)
 
     def isSourceFile(self, filePath):
         """
         Method used to determine if the supplied file originates from the source directory.
+        The source directory itself is also considered part of the source package.
 
         :type filePath: str
         :rtype: bool
         """
 
-        return filePath.startswith(self._sourceDirectory)
+        return filePath == self._sourceDirectory or filePath.startswith(os.path.join(self._sourceDirectory, ''))
 
     def isTargetFile(self, filePath):
         """
         Method used to determine if the supplied file originates from the target directory.
+        The target directory itself is also considered part of the target package.
 
         :type filePath: str
         :rtype: bool
         """
 
-        return filePath.startswith(self._targetDirectory)
+        return filePath == self._targetDirectory or filePath.startswith(os.path.join(self._targetDirectory, ''))
 
     @classmethod
-    def removeEscapeChars(cls, string):
+    def getFileHash(cls, filePath, stat=None):
         """
-        Removes any escape characters from the supplied string.
-        This method supports both python 2 and 3.
+        Returns the BLAKE3 hash for the supplied file.
+        Hashes are cached against the file's size and modified time so unchanged files are only read once.
 
-        :type string: str
+        :type filePath: str
+        :type stat: os.stat_result
         :rtype: str
         """
 
-        # Inspect python version
+        # Check if hash has already been cached
         #
-        if sys.version_info.major == 2:
+        stat = os.stat(filePath) if stat is None else stat
+        size, mtime, fileHash = cls.__hash_cache__.get(filePath, (None, None, None))
+
+        if size == stat.st_size and mtime == stat.st_mtime_ns:
 
-            return string.translate('', cls.__escape_chars__)
+            return fileHash
+
+        # Hash file contents
+        # Empty files cannot be memory mapped!
+        #
+        if stat.st_size == 0:
+
+            fileHash = blake3.blake3().hexdigest()
 
         else:
 
-            return string.translate(str.maketrans('', '', cls.__escape_chars__))
+            with open(filePath, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+
+                fileHash = blake3.blake3(buffer).hexdigest()
+
+        cls.__hash_cache__[filePath] = (stat.st_size, stat.st_mtime_ns, fileHash)
+        return fileHash
 
     @classmethod
-    def isIdentical(cls, sourcePath, targetPath):
+    def isIdenticalCached(cls, sourcePath, targetPath, sourceStat, targetStat):
         """
         Evaluates if the two supplied files are identical.
+        Results are cached against both file sizes and modified times so repeated diffs skip unchanged files.
+        Any modifications to either file will result in a cache miss.
 
         :type sourcePath: str
         :type targetPath: str
+        :type sourceStat: os.stat_result
+        :type targetStat: os.stat_result
         :rtype: bool
         """
 
-        # Try and compare files
-        # If it's a binary file then assume they're not identical
+        # Check if cached result is still valid
+        # Results are keyed by path so stale results are overwritten rather than accumulating
         #
-        try:
+        signature = (sourceStat.st_size, sourceStat.st_mtime_ns, targetStat.st_size, targetStat.st_mtime_ns)
+        cachedSignature, isIdentical = cls.__identical_cache__.get((sourcePath, targetPath), (None, None))
 
-            # Open files and compare
-            # A direct string comparison should be the fastest method
-            #
-            with open(sourcePath, 'r') as sourceFile, open(targetPath, 'r') as targetFile:
+        if cachedSignature == signature:
 
-                # Compare strings without escape characters
-                #
-                source = cls.removeEscapeChars(sourceFile.read())
-                target = cls.removeEscapeChars(targetFile.read())
+            return isIdentical
+
+        # Compare files and cache result
+        # The stat results are passed along so the files are not queried again
+        #
+        isIdentical = cls.isIdentical(sourcePath, targetPath, sourceStat=sourceStat, targetStat=targetStat)
+        cls.__identical_cache__[(sourcePath, targetPath)] = (signature, isIdentical)
+
+        return isIdentical
+
+    @classmethod
+    def isIdentical(cls, sourcePath, targetPath, sourceStat=None, targetStat=None):
+        """
+        Evaluates if the two supplied files are identical.
+        Files are compared as binary unless they are python sources, which are allowed to differ by line endings.
+
+        :type sourcePath: str
+        :type targetPath: str
+        :type sourceStat: os.stat_result
+        :type targetStat: os.stat_result
+        :rtype: bool
+        """
+
+        # Check if python sources only differ by line endings
+        # Exact matches are covered by this comparison as well so each file is only read once
+        #
+        if sourcePath.endswith('.py'):
+
+            return cls.isSourceIdentical(sourcePath, targetPath)
+
+        else:
+
+            return cls.isBinaryIdentical(sourcePath, targetPath, sourceStat=sourceStat, targetStat=targetStat)
+
+    @classmethod
+    def isBinaryIdentical(cls, sourcePath, targetPath, sourceStat=None, targetStat=None):
+        """
+        Evaluates if the two supplied files are byte for byte identical.
+        If blake3 is available then cached file hashes are compared instead.
+        Otherwise, files are compared in binary chunks so that any mismatch can exit early.
+        Large files are memory mapped to avoid copying them through intermediate read buffers.
+
+        :type sourcePath: str
+        :type targetPath: str
+        :type sourceStat: os.stat_result
+        :type targetStat: os.stat_result
+        :rtype: bool
+        """
 
-                return source == target
+        # Check if file sizes match
+        # This is a cheap way of rejecting files without opening them
+        #
+        sourceStat = os.stat(sourcePath) if sourceStat is None else sourceStat
+        targetStat = os.stat(targetPath) if targetStat is None else targetStat
 
-        except UnicodeDecodeError:
+        if sourceStat.st_size != targetStat.st_size:
 
             return False
 
-    def makeDirectories(self, directory):
+        # Check if file hashes can be compared
+        #
+        if blake3 is not None:
+
+            return cls.getFileHash(sourcePath, stat=sourceStat) == cls.getFileHash(targetPath, stat=targetStat)
+
+        # Check if files should be memory mapped
+        #
+        size = sourceStat.st_size
+
+        if size > cls.__mmap_threshold__:
+
+            with open(sourcePath, 'rb') as sourceFile, mmap.mmap(sourceFile.fileno(), 0, access=mmap.ACCESS_READ) as sourceBuffer:
+
+                with open(targetPath, 'rb') as targetFile, mmap.mmap(targetFile.fileno(), 0, access=mmap.ACCESS_READ) as targetBuffer:
+
+                    return all(
+                        sourceBuffer[i:i + cls.__mmap_chunk_size__] == targetBuffer[i:i + cls.__mmap_chunk_size__]
+                        for i in range(0, size, cls.__mmap_chunk_size__)
+                    )
+
+        # Open files and compare chunks
+        #
+        with open(sourcePath, 'rb') as sourceFile, open(targetPath, 'rb') as targetFile:
+
+            while True:
+
+                sourceChunk = sourceFile.read(cls.__chunk_size__)
+                targetChunk = targetFile.read(cls.__chunk_size__)
+
+                if sourceChunk != targetChunk:
+
+                    return False
+
+                elif not sourceChunk:
+
+                    return True
+
+    @staticmethod
+    def isSourceIdentical(sourcePath, targetPath):
+        """
+        Evaluates if the two supplied python sources are identical.
+        Sources are compared as bytes after normalizing their line endings so no decoding is required.
+        Any other difference, including byte order marks, is still treated as an edit.
+
+        :type sourcePath: str
+        :type targetPath: str
+        :rtype: bool
+        """
+
+        with open(sourcePath, 'rb') as sourceFile, open(targetPath, 'rb') as targetFile:
+
+            source = sourceFile.read().replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+            target = targetFile.read().replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+
+            return source == target
+
+    @staticmethod
+    def makeDirectories(directory):
         """
         Creates all of the directories from the supplied path.
         For simplicity sake this method will ignore any pre-existing directories.
@@ -566,14 +1138,27 @@ class QP4ckageMerger(quicwindow.QUicWindow):
         :rtype: None
         """
 
-        try:
+        os.makedirs(directory, exist_ok=True)
 
-            return os.makedirs(directory)
+    @staticmethod
+    def copyFiles(files):
+        """
+        Copies the target files over their associated source files.
+        Since this work is bound by file IO the files are copied in parallel.
 
-        except OSError as exception:
+        :type files: list[tuple[str, str]]
+        :rtype: None
+        """
 
-            log.debug(exception)
-            return
+        # Copy file contents
+        # Permissions are not copied since the source files are managed by perforce
+        #
+        sourcePaths = [sourcePath for (sourcePath, targetPath) in files]
+        targetPaths = [targetPath for (sourcePath, targetPath) in files]
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+
+            list(executor.map(shutil.copyfile, targetPaths, sourcePaths))
 
     def makePathRelative(self, filePath):
         """
@@ -592,6 +1177,41 @@ class QP4ckageMerger(quicwindow.QUicWindow):
         else:
 
             return os.path.relpath(filePath, self._targetDirectory)
+
+    def stopDiff(self):
+        """
+        Method used to stop any diff that is currently running.
+        The thread is waited on before being released so its results can never reach the package model.
+
+        :rtype: None
+        """
+
+        # Check if a diff is running
+        #
+        if self._diffThread is None:
+
+            return
+
+        # Interrupt diff thread and wait for it to exit
+        #
+        self._diffThread.requestInterruption()
+        self._diffThread.wait()
+
+        self.releaseDiff()
+
+    def releaseDiff(self):
+        """
+        Method used to release the current diff thread and progress dialog.
+
+        :rtype: None
+        """
+
+        self._progressDialog.close()
+        self._progressDialog.deleteLater()
+        self._progressDialog = None
+
+        self._diffThread.deleteLater()
+        self._diffThread = None
     # endregion
     
     # region Events
@@ -610,6 +1230,23 @@ class QP4ckageMerger(quicwindow.QUicWindow):
         # Populate clients
         #
         self.refreshPushButton.click()
+
+    def closeEvent(self, event):
+        """
+        Overloaded method called after the window has been closed.
+
+        :type event: QtGui.QCloseEvent
+        :rtype: None
+        """
+
+        # Stop any running diffs
+        # Qt will abort if a running thread is destroyed!
+        #
+        self.stopDiff()
+
+        # Call inherited method
+        #
+        super(QP4ckageMerger, self).closeEvent(event)
     # endregion
     
     # region Slots
@@ -647,6 +1284,8 @@ class QP4ckageMerger(quicwindow.QUicWindow):
         :rtype: None
         """
 
+        self.stopDiff()
+
         self._sourceDirectory = os.path.normpath(text)
 
     @QtCore.Slot(bool)
@@ -683,6 +1322,8 @@ class QP4ckageMerger(quicwindow.QUicWindow):
         :rtype: None
         """
 
+        self.stopDiff()
+
         self._targetDirectory = os.path.normpath(text)
 
     @QtCore.Slot(bool)
@@ -701,25 +1342,196 @@ class QP4ckageMerger(quicwindow.QUicWindow):
             log.warning('Unable to evaluate package directories!')
             return
 
+        # Stop any running diffs
+        # Otherwise multiple walks would stack up when diffing repeatedly
+        #
+        self.stopDiff()
+
+        # Check if cached comparisons should be discarded
+        #
+        if self.forceRescanCheckBox.isChecked():
+
+            self.__class__.__identical_cache__.clear()
+            self.__class__.__hash_cache__.clear()
+
+        # Collect and evaluate file pairs in the background
+        # The results are sent back to the main thread once they are ready
+        # The package model is left untouched until then in case the diff is cancelled or fails
+        #
+        self._diffThread = QDiffThread(self._sourceDirectory, self._targetDirectory, shallow=self._fastCompare, parent=self)
+        self._diffThread.progressChanged.connect(self.onDiffProgressChanged)
+        self._diffThread.diffReady.connect(self.onDiffReady)
+        self._diffThread.diffFailed.connect(self.onDiffFailed)
+        self._diffThread.finished.connect(self.onDiffFinished)
+
+        self._progressDialog = QtWidgets.QProgressDialog('Comparing files...', 'Cancel', 0, 0, parent=self)
+        self._progressDialog.canceled.connect(self._diffThread.requestInterruption)
+        self._progressDialog.show()
+
+        self._diffThread.start()
+
+    @QtCore.Slot(int, int)
+    def onDiffProgressChanged(self, value, maximum):
+        """
+        Progress changed slot method responsible for updating the progress dialog.
+
+        :type value: int
+        :type maximum: int
+        :rtype: None
+        """
+
+        if self.sender() is self._diffThread:
+
+            self._progressDialog.setMaximum(maximum)
+            self._progressDialog.setValue(value)
+
+    @QtCore.Slot(object, object, object, object)
+    def onDiffReady(self, directories, files, statuses, conflicts):
+        """
+        Diff ready slot method responsible for populating the package model from the evaluated file pairs.
+        Any conflicting entries are reported to the user since they are excluded from the model.
+
+        :type directories: list[str]
+        :type files: dict[str, list]
+        :type statuses: dict[str, QFileStatus]
+        :type conflicts: list[str]
+        :rtype: None
+        """
+
+        # Check if results are from the current diff
+        # Stopped threads can still have queued signals pending!
+        #
+        if self.sender() is not self._diffThread:
+
+            return
+
         # Reset package model
+        # Changing either package stops the diff so the current directories still match these results
         #
+        self.detachModel()
         self.packageItemModel.setRowCount(0)
+        self._pathIndex.clear()
+        self._depotItems.clear()
+        self._packageDirectories = (self._sourceDirectory, self._targetDirectory)
 
-        # Add top level item
+        # Populate top level item before adding it to the model
+        # Items outside of a model don't emit any signals so the view is only notified once
         #
-        name = os.path.split(self._sourceDirectory)[1]
-        topLevelItem = QtGui.QStandardItem(QtGui.QIcon(':/p4v/icons/p4v_folder.png'), name)
+        name = os.path.split(self._packageDirectories[0])[1]
+        topLevelItem = QDirectoryItem(name)
+
+        self._pathIndex['.'] = topLevelItem
+
+        # Queue child items under their parents
+        # This way each parent only has to append its children once
+        #
+        pendingRows = defaultdict(list)
+
+        for relativePath in directories:
+
+            self.addDirectoryItem(relativePath, pendingRows=pendingRows)
+
+        for relativePath in files.keys():
+
+            self.addFileItem(relativePath, status=statuses[relativePath], pendingRows=pendingRows)
+
+        for (parentPath, rows) in pendingRows.items():
+
+            self._pathIndex[parentPath].appendRows(rows)
+
+        # Collect directories that contain changes
+        # Unchanged branches are left collapsed so the view never has to lay out their rows
+        #
+        expandedPaths = {'.'}
+
+        for (relativePath, status) in statuses.items():
+
+            if status == QFileStatus.Unchanged:
+
+                continue
 
+            parentPath = os.path.dirname(relativePath) or '.'
+
+            while parentPath not in expandedPaths:
+
+                expandedPaths.add(parentPath)
+                parentPath = os.path.dirname(parentPath) or '.'
+
+        # Add top level item and expand changed directories
+        # View updates are suspended to avoid any interim paints
+        #
         self.packageItemModel.invisibleRootItem().appendRow(topLevelItem)
+        self.packageTreeView.setUpdatesEnabled(False)
+
+        try:
+
+            self.attachModel()
+
+            for path in expandedPaths:
 
-        # Add source directory
+                self.packageTreeView.setExpanded(self._pathIndex[path].index(), True)
+
+        finally:
+
+            self.packageTreeView.setUpdatesEnabled(True)
+
+        # Check if any entries were skipped
+        # These require manual intervention since they will not be committed
         #
-        self.addDirectoryItem(self._sourceDirectory)
-        self.addDirectoryItem(self._targetDirectory)
+        if len(conflicts) > 0:
+
+            for relativePath in conflicts:
 
-        # Expand all items
+                log.warning('Skipping file and directory with the same name: %s' % relativePath)
+
+            QtWidgets.QMessageBox.warning(
+                self,
+                'P4ckageMerger',
+                'The following entries are a file in one package and a directory in the other!\n'
+                'These entries have been skipped and must be merged manually:\n\n%s' % '\n'.join(conflicts)
+            )
+
+    @QtCore.Slot(str)
+    def onDiffFailed(self, message):
+        """
+        Diff failed slot method responsible for notifying the user of any errors.
+        The previous package model is kept as is.
+
+        :type message: str
+        :rtype: None
+        """
+
+        # Check if error is from the current diff
         #
-        self.packageTreeView.expandAll()
+        if self.sender() is not self._diffThread:
+
+            return
+
+        QtWidgets.QMessageBox.warning(self, 'P4ckageMerger', 'Unable to diff packages!\n%s' % message)
+
+    @QtCore.Slot()
+    def onDiffFinished(self):
+        """
+        Finished slot method responsible for cleaning up after the diff thread.
+
+        :rtype: None
+        """
+
+        # Check if thread has already been released
+        #
+        if self.sender() is not self._diffThread:
+
+            return
+
+        # Check if diff was cancelled
+        #
+        if self._diffThread.isInterruptionRequested():
+
+            log.warning('Diff cancelled by user!')
+
+        # Release diff thread and progress dialog
+        #
+        self.releaseDiff()
 
     @QtCore.Slot(bool)
     def on_refreshPushButton_clicked(self, checked=False):
@@ -778,6 +1590,17 @@ class QP4ckageMerger(quicwindow.QUicWindow):
 
         self._currentChangelist = self._changelists[index]
 
+    @QtCore.Slot(bool)
+    def on_fastCompareCheckBox_toggled(self, checked):
+        """
+        Toggled slot method responsible for updating the internal fast compare flag.
+
+        :type checked: bool
+        :rtype: None
+        """
+
+        self._fastCompare = checked
+
     @QtCore.Slot(bool)
     def on_commitPushButton_clicked(self, checked=False):
         """
@@ -799,46 +1622,58 @@ class QP4ckageMerger(quicwindow.QUicWindow):
             QtWidgets.QMessageBox.warning(self, 'P4ckageMerger', 'Unable to connect to server!')
             return
 
-        # Walk through tree
+        # Group depot items by status
+        # Unchanged items are never inspected past this point
         #
-        for item in self.walk():
+        itemsByStatus = defaultdict(list)
 
-            # Check if this is a depot item
-            #
-            if not isinstance(item, QDepotItem):
+        for item in self._depotItems:
 
-                continue
+            itemsByStatus[item.status()].append(item)
+
+        adds = [(item.sourcePath(), item.targetPath()) for item in itemsByStatus[QFileStatus.Add]]
+        edits = [(item.sourcePath(), item.targetPath()) for item in itemsByStatus[QFileStatus.Edit]]
+        deletes = [item.sourcePath() for item in itemsByStatus[QFileStatus.Delete]]
+
+        # Copy new files before adding them
+        # Perforce commands accept multiple files so each command only needs to be executed once
+        #
+        if adds:
 
-            # Inspect item status
+            for (sourcePath, targetPath) in adds:
+
+                log.info('Adding: %s -> %s' % (targetPath, sourcePath))
+
+            # Create parent directories before copying in parallel
+            # This way no two workers can race to create the same directory
             #
-            log.info('Inspecting: %s' % item.text())
+            for directory in {os.path.dirname(sourcePath) for (sourcePath, targetPath) in adds}:
 
-            sourcePath = item.sourcePath()
-            targetPath = item.targetPath()
-            status = item.status()
+                self.makeDirectories(directory)
 
-            if status == QFileStatus.Edit:
+            self.copyFiles(adds)
 
-                log.info('Editing: %s -> %s' % (targetPath, sourcePath))
+            cmds.add(*[sourcePath for (sourcePath, targetPath) in adds], user=user, port=port, client=client, changelist=changelist)
 
-                cmds.edit(sourcePath, user=user, port=port, client=client, changelist=changelist)
-                shutil.copy(targetPath, sourcePath)
+        # Open edited files before overwriting them
+        #
+        if edits:
 
-            elif status == QFileStatus.Add:
+            cmds.edit(*[sourcePath for (sourcePath, targetPath) in edits], user=user, port=port, client=client, changelist=changelist)
 
-                log.info('Adding: %s -> %s' % (targetPath, sourcePath))
+            for (sourcePath, targetPath) in edits:
 
-                self.makeDirectories(os.path.dirname(sourcePath))
-                shutil.copy(targetPath, sourcePath)
+                log.info('Editing: %s -> %s' % (targetPath, sourcePath))
 
-                cmds.add(sourcePath, user=user, port=port, client=client, changelist=changelist)
+            self.copyFiles(edits)
 
-            elif status == QFileStatus.Delete:
+        # Mark removed files for delete
+        #
+        if deletes:
 
-                log.info('Deleting: %s' % sourcePath)
-                cmds.delete(sourcePath, user=user, port=port, client=client, changelist=changelist)
+            for sourcePath in deletes:
 
-            else:
+                log.info('Deleting: %s' % sourcePath)
 
-                continue
+            cmds.delete(*deletes, user=user, port=port, client=client, changelist=changelist)
     # endregion